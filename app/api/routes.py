@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import timedelta
 from pydantic import BaseModel
 from app.models.database import SessionLocal, User
-from app.services.database import create_resume_entry, get_resume_entries
+from app.services.database import create_resume_entry, get_resume_entries, get_resume_revision
+from app.services.search import search_cache, search_resume_entries
 from app.services.llm import LLMService
+from app.services.serialization import get_listing_payload, listing_cache, serialize_entries
+from app.services.profiling import profile_request
+from app.services.tracing import get_trace
 from loguru import logger
 from fastapi.security import OAuth2PasswordRequestForm
 from app.services.auth import (
     authenticate_user,
     create_access_token,
     get_current_user,
+    get_current_active_admin,
+    get_profiling_enabled,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_password_hash
 )
 from app.schemas.auth import Token, UserCreate, User as UserSchema
-from app.schemas.resume import ResumeEntryCreate, ResumeEntry
+from app.schemas.resume import ResumeEntryCreate, ResumeEntry, ResumeSearchResponse
 
 router = APIRouter()
 
@@ -29,47 +35,39 @@ def get_db():
 
 llm_service = LLMService()
 
-class ResumeEntryBase(BaseModel):
-    category: str
-    title: str
-    description: str
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
-
-class ResumeEntryCreate(ResumeEntryBase):
-    pass
-
-class ResumeEntry(ResumeEntryBase):
-    id: int
-    created_at: datetime
-    updated_at: datetime
-
-    class Config:
-        from_attributes = True
-
 class QuestionRequest(BaseModel):
     question: str
 
-@router.post("/resume/", response_model=ResumeEntry)
-def add_resume_entry(entry: ResumeEntryCreate, db: Session = Depends(get_db)):
-    """Adiciona uma nova entrada no currículo"""
-    return create_resume_entry(
-        db=db,
-        category=entry.category,
-        title=entry.title,
-        description=entry.description,
-        start_date=entry.start_date,
-        end_date=entry.end_date
-    )
+def get_portfolio_owner(username: str, db: Session = Depends(get_db)) -> User:
+    """Resolve o dono do portfólio a partir do username da rota"""
+    owner = db.query(User).filter(User.username == username).first()
+    if owner is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfólio não encontrado"
+        )
+    return owner
 
-@router.get("/resume/", response_model=List[ResumeEntry])
-def list_resume_entries(
-    category: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    """Lista todas as entradas do currículo"""
+def _invalidate_portfolio(owner_id: Optional[int]) -> None:
+    """Descarta os caches de um portfólio após alterações no currículo"""
+    llm_service.invalidate_tenant(owner_id)
+    listing_cache.invalidate_tenant(owner_id)
+    search_cache.invalidate_tenant(owner_id)
+
+def _list_entries(request: Request, db: Session, category: Optional[str], owner_id: Optional[int]):
     try:
-        return get_resume_entries(db, category)
+        # Listagens repetidas na mesma revisão do currículo viram uma cópia de bytes em memória
+        key = (category, get_resume_revision(owner_id))
+        body, encoding = get_listing_payload(
+            owner_id,
+            key,
+            request.headers.get("accept-encoding", ""),
+            lambda: serialize_entries(get_resume_entries(db, category, owner_id=owner_id))
+        )
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"Erro ao listar entradas: {str(e)}")
         raise HTTPException(
@@ -77,24 +75,130 @@ def list_resume_entries(
             detail=f"Erro ao listar entradas: {str(e)}"
         )
 
-@router.post("/ask/")
-def ask_question(question_req: QuestionRequest, db: Session = Depends(get_db)):
-    """Responde a uma pergunta sobre o currículo usando o LLM"""
+def _search_entries(db: Session, q: str, limit: int, offset: int, owner_id: Optional[int]):
     try:
-        resume_entries = get_resume_entries(db)
+        has_more, results = search_resume_entries(
+            db, q, limit=limit, offset=offset, owner_id=owner_id
+        )
+        return {
+            "query": q,
+            "limit": limit,
+            "offset": offset,
+            "has_more": has_more,
+            "results": [
+                {"entry": entry, "snippet": snippet, "highlights": highlights, "rank": rank}
+                for entry, snippet, highlights, rank in results
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Erro ao buscar entradas: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar entradas: {str(e)}"
+        )
+
+def _ask(db: Session, question: str, owner_id: Optional[int], response: Response, profiling: bool):
+    try:
+        with profile_request("ask", profiling) as profile:
+            resume_entries, full_portfolio = llm_service.select_entries(db, question, owner_id=owner_id)
+            
+            answer = llm_service.answer_question(
+                question, resume_entries, tenant_id=owner_id, full_portfolio=full_portfolio
+            )
         
-        response = llm_service.answer_question(question_req.question, resume_entries)
+        if profile.get("path"):
+            response.headers["X-Profile-File"] = profile["path"]
         
         return {
-            "question": question_req.question,
-            "answer": response
+            "question": question,
+            "answer": answer
         }
     except Exception as e:
         logger.error(f"Erro ao processar pergunta: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Erro ao processar sua pergunta"
-        ) 
+        )
+
+@router.post("/resume/", response_model=ResumeEntry)
+def add_resume_entry(entry: ResumeEntryCreate, db: Session = Depends(get_db)):
+    """Adiciona uma nova entrada no currículo do portfólio padrão"""
+    db_entry = create_resume_entry(
+        db=db,
+        category=entry.category,
+        title=entry.title,
+        description=entry.description,
+        start_date=entry.start_date,
+        end_date=entry.end_date
+    )
+    _invalidate_portfolio(None)
+    return db_entry
+
+@router.get("/resume/", response_model=List[ResumeEntry])
+def list_resume_entries(
+    request: Request,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Lista todas as entradas do currículo do portfólio padrão"""
+    return _list_entries(request, db, category, owner_id=None)
+
+@router.get("/resume/search", response_model=ResumeSearchResponse)
+def search_resume(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Busca entradas do currículo do portfólio padrão por palavra-chave, ordenadas por relevância"""
+    return _search_entries(db, q, limit, offset, owner_id=None)
+
+@router.post("/ask/")
+def ask_question(
+    question_req: QuestionRequest,
+    response: Response,
+    profiling: bool = Depends(get_profiling_enabled),
+    db: Session = Depends(get_db)
+):
+    """Responde a uma pergunta sobre o currículo do portfólio padrão usando o LLM"""
+    return _ask(db, question_req.question, None, response, profiling)
+
+@router.get("/portfolios/{username}/resume/", response_model=List[ResumeEntry])
+def list_portfolio_entries(
+    request: Request,
+    category: Optional[str] = None,
+    owner: User = Depends(get_portfolio_owner),
+    db: Session = Depends(get_db)
+):
+    """Lista as entradas do currículo de um portfólio"""
+    return _list_entries(request, db, category, owner_id=owner.id)
+
+@router.get("/portfolios/{username}/resume/search", response_model=ResumeSearchResponse)
+def search_portfolio(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    owner: User = Depends(get_portfolio_owner),
+    db: Session = Depends(get_db)
+):
+    """Busca entradas do currículo de um portfólio por palavra-chave"""
+    return _search_entries(db, q, limit, offset, owner_id=owner.id)
+
+@router.post("/portfolios/{username}/ask/")
+def ask_portfolio(
+    question_req: QuestionRequest,
+    response: Response,
+    profiling: bool = Depends(get_profiling_enabled),
+    owner: User = Depends(get_portfolio_owner),
+    db: Session = Depends(get_db)
+):
+    """Responde a uma pergunta sobre o currículo de um portfólio usando o LLM"""
+    return _ask(db, question_req.question, owner.id, response, profiling)
+
+@router.get("/admin/traces")
+async def get_traces(current_user: User = Depends(get_current_active_admin)):
+    """Spans recentes no Trace Event Format, para abrir no Perfetto ou chrome://tracing"""
+    return get_trace()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
@@ -121,38 +225,61 @@ async def login_for_access_token(
         "token_type": "bearer"
     } 
 
-@router.post("/protected/resume", response_model=ResumeEntry)
-async def protected_add_resume_entry(
-    entry: ResumeEntryCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Adiciona uma nova entrada no currículo (requer autenticação)"""
+def _add_entry(db: Session, entry: ResumeEntryCreate, current_user: User, owner_id: Optional[int]):
+    """
+    Adiciona uma entrada em um portfólio. Cada usuário pode escrever no próprio
+    portfólio; o portfólio padrão e os de outros usuários exigem admin.
+    """
+    if owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas administradores podem adicionar entradas neste portfólio"
+        )
+
     try:
-        # Verifica se o usuário é admin
-        if not current_user.is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Apenas administradores podem adicionar entradas"
-            )
-        
-        return create_resume_entry(
+        db_entry = create_resume_entry(
             db=db,
             category=entry.category,
             title=entry.title,
             description=entry.description,
             start_date=entry.start_date,
-            end_date=entry.end_date
+            end_date=entry.end_date,
+            owner_id=owner_id
         )
+        _invalidate_portfolio(owner_id)
+        return db_entry
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao adicionar entrada: {str(e)}"
         )
 
+@router.post("/protected/resume", response_model=ResumeEntry)
+async def protected_add_resume_entry(
+    entry: ResumeEntryCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Adiciona uma nova entrada no portfólio padrão (requer admin)"""
+    return _add_entry(db, entry, current_user, owner_id=None)
+
+@router.post("/portfolios/{username}/resume/", response_model=ResumeEntry)
+async def add_portfolio_entry(
+    entry: ResumeEntryCreate,
+    owner: User = Depends(get_portfolio_owner),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Adiciona uma nova entrada em um portfólio (o próprio dono ou um admin)"""
+    return _add_entry(db, entry, current_user, owner_id=owner.id)
+
 @router.post("/users", response_model=UserSchema)
 async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Cria um novo usuário"""
+    """
+    Cria um novo usuário, sem privilégios de admin: o cadastro é aberto, e admins
+    podem escrever em qualquer portfólio. Admins são criados por app.create_user
+    ou promovidos por app.update_admin.
+    """
     try:
         # Verifica se o usuário já existe
         db_user = db.query(User).filter(User.username == user.username).first()
@@ -167,7 +294,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         db_user = User(
             username=user.username,
             password_hash=hashed_password,
-            is_admin=True
+            is_admin=False
         )
         
         db.add(db_user)
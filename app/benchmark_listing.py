@@ -0,0 +1,88 @@
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import datetime, timedelta
+from app.models.database import Base, ResumeEntry
+from app.schemas.resume import ResumeEntry as ResumeEntrySchema
+from app.services.database import get_resume_entries, get_resume_revision
+from app.services.serialization import get_listing_payload, serialize_entries
+from loguru import logger
+import json
+import timeit
+
+CATEGORIES = ["education", "experience", "skills", "projects"]
+
+def create_session(n_entries: int):
+    """Cria um banco SQLite em memória com n_entries entradas no portfólio padrão"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    now = datetime.utcnow()
+    db.add_all([
+        ResumeEntry(
+            category=CATEGORIES[i % len(CATEGORIES)],
+            title=f"Entrada {i}",
+            description=f"Descrição da entrada {i} com detalhes sobre tecnologias e resultados. " * 3,
+            start_date=now - timedelta(days=365),
+            end_date=now,
+            created_at=now,
+            updated_at=now
+        )
+        for i in range(n_entries)
+    ])
+    db.commit()
+    return db
+
+def run(n_entries: int = 10_000, repeat: int = 20):
+    db = create_session(n_entries)
+
+    def pydantic_stdlib():
+        """Caminho antigo: ORM + validação Pydantic + json da stdlib"""
+        entries = get_resume_entries(db)
+        return json.dumps([
+            ResumeEntrySchema.model_validate(entry).model_dump(mode="json")
+            for entry in entries
+        ]).encode()
+
+    def orm_orjson():
+        """ORM + orjson direto das linhas, sem validação"""
+        return serialize_entries(get_resume_entries(db))
+
+    def cached(accept_encoding: str):
+        """Revisão do currículo + bytes já serializados/comprimidos do cache"""
+        def call():
+            key = (None, get_resume_revision())
+            return get_listing_payload(None, key, accept_encoding, orm_orjson)[0]
+        return call
+
+    def db_revision():
+        """Revisão consultada no banco (contagem, maior id e maior updated_at), para comparação"""
+        return db.query(
+            func.count(ResumeEntry.id), func.max(ResumeEntry.id), func.max(ResumeEntry.updated_at)
+        ).filter(ResumeEntry.owner_id.is_(None)).one()
+
+    cases = [
+        ("pydantic + json", pydantic_stdlib),
+        ("orm + orjson", orm_orjson),
+        ("cache identity", cached("")),
+        ("cache gzip", cached("gzip")),
+        ("cache br", cached("br, gzip")),
+    ]
+    logger.info(f"Listagem com {n_entries} entradas ({repeat} execuções por caso)")
+    for name, case in cases:
+        size = len(case())
+        elapsed = timeit.timeit(case, number=repeat) / repeat
+        logger.info(f"{name:<16} {elapsed * 1000:9.3f} ms  {size:>10} bytes")
+
+    # Custo da chave de cache, já incluído nos casos "cache" acima
+    for name, revision in (("revisão (banco)", db_revision), ("revisão (memória)", get_resume_revision)):
+        elapsed = timeit.timeit(revision, number=repeat) / repeat
+        logger.info(f"{name:<16} {elapsed * 1000:9.3f} ms")
+
+    db.close()
+
+if __name__ == "__main__":
+    run()
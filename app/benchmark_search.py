@@ -0,0 +1,111 @@
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import datetime
+from app.models.database import Base, ResumeEntry
+from app.services.search import find_relevant_entries, init_search_index, search_cache, search_resume_entries
+from loguru import logger
+import random
+import timeit
+
+CATEGORIES = ["education", "experience", "skills", "projects"]
+COMMON_WORDS = [
+    "python", "java", "sql", "docker", "gestão", "projeto",
+    "desenvolvimento", "equipe", "dados", "api",
+]
+# Aparece em ~1% das entradas: ~1000 resultados num portfólio de 100k
+MEDIUM_WORD = "kubernetes"
+
+def _text(rng: random.Random, n_words: int) -> str:
+    """Texto com ~30% de palavras comuns e o resto de um vocabulário de 20k termos"""
+    return " ".join(
+        rng.choice(COMMON_WORDS) if rng.random() < 0.3 else f"termo{rng.randrange(20000)}"
+        for _ in range(n_words)
+    )
+
+def create_session(n_entries: int, n_portfolios: int):
+    """
+    Cria um banco SQLite em memória com n_entries entradas divididas entre
+    n_portfolios portfólios, mais um portfólio padrão com o mesmo tamanho médio.
+    Com n_portfolios=0, todas as entradas ficam no portfólio padrão.
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    init_search_index(db)
+
+    rng = random.Random(42)
+    per_portfolio = n_entries // (n_portfolios + 1)
+    now = datetime.utcnow()
+    db.execute(insert(ResumeEntry), [
+        {
+            "owner_id": (i // per_portfolio) or None,
+            "category": rng.choice(CATEGORIES),
+            "title": _text(rng, 4),
+            "description": _text(rng, 40) + (f" {MEDIUM_WORD}" if rng.random() < 0.01 else ""),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n_entries)
+    ])
+    db.commit()
+    return db
+
+def _cold(owner_id, func):
+    """Executa a busca sem as estatísticas do portfólio em cache (primeira busca após uma escrita)"""
+    def call():
+        search_cache.invalidate_tenant(owner_id)
+        return func()
+    return call
+
+def measure(title: str, cases, repeat: int):
+    logger.info(title)
+    for name, func in cases:
+        func()
+        elapsed = timeit.timeit(func, number=repeat) / repeat
+        logger.info(f"{name:<24} {elapsed * 1000:9.3f} ms")
+
+def run(n_entries: int = 100_000, n_portfolios: int = 999, repeat: int = 200):
+    db = create_session(n_entries, n_portfolios)
+    measure(
+        f"Busca com {n_entries} entradas em {n_portfolios + 1} portfólios ({repeat} execuções por caso)",
+        [
+            ("termo comum", lambda: search_resume_entries(db, "python", owner_id=42)),
+            ("dois termos", lambda: search_resume_entries(db, "python dados", owner_id=42)),
+            ("prefixo", lambda: search_resume_entries(db, "desenvolv", owner_id=42)),
+            ("termo raro", lambda: search_resume_entries(db, "termo123", owner_id=42)),
+            ("página 2", lambda: search_resume_entries(db, "python", offset=20, owner_id=42)),
+            ("portfólio padrão", lambda: search_resume_entries(db, "python")),
+            ("pré-filtro LLM", lambda: find_relevant_entries(
+                db, "Quais projetos com Python e Docker?", owner_id=42
+            )),
+            ("termo comum, cache frio", _cold(42, lambda: search_resume_entries(db, "python", owner_id=42))),
+        ],
+        repeat
+    )
+    db.close()
+
+    # Um único portfólio com todas as entradas, como numa instalação de um só usuário
+    db = create_session(n_entries, 0)
+    # As estatísticas em cache do portfólio padrão são do banco anterior
+    search_cache.invalidate_tenant(None)
+    measure(
+        f"Busca com {n_entries} entradas em um único portfólio ({repeat} execuções por caso)",
+        [
+            ("termo comum (~75k)", lambda: search_resume_entries(db, "python")),
+            ("~1000 resultados", lambda: search_resume_entries(db, MEDIUM_WORD)),
+            ("dois termos", lambda: search_resume_entries(db, "python dados")),
+            ("prefixo", lambda: search_resume_entries(db, "desenvolv")),
+            ("página 6", lambda: search_resume_entries(db, MEDIUM_WORD, offset=100)),
+            ("pré-filtro LLM", lambda: find_relevant_entries(db, "Quais projetos com Python e Docker?")),
+            ("termo comum, cache frio", _cold(None, lambda: search_resume_entries(db, "python"))),
+            ("~1000, cache frio", _cold(None, lambda: search_resume_entries(db, MEDIUM_WORD))),
+        ],
+        repeat
+    )
+    db.close()
+
+if __name__ == "__main__":
+    run()
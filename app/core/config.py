@@ -10,6 +10,24 @@ class Settings(BaseSettings):
     
     DATABASE_URL: str = "sqlite:///./portfolio.db"
     
+    # Orçamento global de memória para contexto, respostas e estado KV de todos os portfólios
+    TENANT_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    KV_STATE_CACHE_ENABLED: bool = True
+    
+    # Respostas maiores que isso são comprimidas (gzip/brotli)
+    COMPRESSION_MIN_SIZE: int = 1024
+    # Orçamento de memória das listagens pré-serializadas e pré-comprimidas
+    LISTING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Orçamento de memória das estatísticas de busca (bm25) por portfólio
+    SEARCH_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    
+    # Spans recentes mantidos em memória e arquivo opcional para exportá-los (Trace Event Format)
+    TRACE_BUFFER_SIZE: int = 10000
+    TRACE_FILE: str = ""
+    # Profiling sob demanda (header X-Profile ou ?profile=1, apenas admins)
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL: float = 0.001
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
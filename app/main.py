@@ -1,12 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from loguru import logger
 from app.services.model_downloader import ModelDownloader
-from app.models.database import init_db, Base
+from app.models.database import init_db, Base, SessionLocal
 from app.api.routes import router
 from app.database import create_tables, engine
+from app.services.database import migrate_resume_owner
+from app.services.search import init_search_index
+from app.services.tracing import flush_traces
+from app.core.config import settings
 
-app = FastAPI(title="Portfolio AI")
+app = FastAPI(title="Portfolio AI", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +22,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Respostas que já chegam comprimidas (Content-Encoding definido) passam direto;
+# o GZipMiddleware só ignora essas respostas a partir do starlette 0.22 (ver requirements.txt)
+app.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 app.include_router(router, prefix="/api/v1")
 
 @app.on_event("startup")
@@ -24,6 +34,15 @@ async def startup_event():
     
     init_db()
     logger.info("Banco de dados inicializado")
+
+    db = SessionLocal()
+    try:
+        migrate_resume_owner(db)
+        init_search_index(db)
+    except Exception as e:
+        logger.error(f"Erro ao preparar entradas do currículo: {e}")
+    finally:
+        db.close()
     
     downloader = ModelDownloader()
     if not downloader.download_model():
@@ -32,6 +51,10 @@ async def startup_event():
     # Criar tabelas ao iniciar a aplicação
     create_tables()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    flush_traces()
+
 @app.get("/")
 async def root():
     return {"message": "Portfolio AI Backend está funcionando!"} 
@@ -0,0 +1,29 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from datetime import datetime
+from app.database import Base, SessionLocal, engine
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, unique=True, index=True, nullable=False)
+    password_hash = Column(String, nullable=False)
+    is_admin = Column(Boolean, default=False)
+
+class ResumeEntry(Base):
+    __tablename__ = "resume_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Dono do portfólio; entradas sem dono formam o portfólio padrão
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    category = Column(String, index=True, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    start_date = Column(DateTime, nullable=True)
+    end_date = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def init_db():
+    """Cria as tabelas que ainda não existem"""
+    Base.metadata.create_all(bind=engine)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 
 class ResumeEntryBase(BaseModel):
     category: str
@@ -18,4 +18,18 @@ class ResumeEntry(ResumeEntryBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class ResumeSearchResult(BaseModel):
+    entry: ResumeEntry
+    snippet: str
+    # Posições (início, fim) dos termos encontrados dentro de snippet
+    highlights: List[Tuple[int, int]]
+    rank: float
+
+class ResumeSearchResponse(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[ResumeSearchResult]
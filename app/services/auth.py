@@ -5,9 +5,10 @@ from typing import Optional
 from app.models.database import User
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from app.database import get_db
 from app.schemas.auth import TokenData
+from app.services.tracing import traced
 from loguru import logger
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -16,6 +17,7 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/token", auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -41,6 +43,7 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user 
 
+@traced("auth.get_current_user")
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -86,4 +89,27 @@ async def get_current_active_admin(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="O usuário não tem permissões de administrador"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def get_profiling_enabled(
+    request: Request,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> bool:
+    """
+    Verifica se a requisição pediu profiling (header X-Profile ou ?profile=1).
+    O profiling é restrito a administradores.
+    """
+    flag = request.headers.get("X-Profile") or request.query_params.get("profile")
+    if not flag or flag.lower() in ("0", "false", "no"):
+        return False
+
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Profiling requer autenticação",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await get_current_user(token, db)
+    await get_current_active_admin(user)
+    return True
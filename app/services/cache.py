@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+from loguru import logger
+import sys
+import threading
+
+class TenantCache:
+    """
+    Cache LRU particionado por tenant (portfólio) com um orçamento global de memória.
+    Cada item é identificado por (tenant, namespace, chave); quando o total passa
+    de max_bytes, os itens menos usados são removidos, de qualquer tenant.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple[Any, str, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._tenant_keys: Dict[Any, Set[Tuple[Any, str, Hashable]]] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_size(value: Any) -> int:
+        """Estimativa barata do tamanho de um valor em bytes"""
+        return sys.getsizeof(value)
+
+    def get(self, tenant: Any, namespace: str, key: Hashable) -> Optional[Any]:
+        """Retorna o valor em cache e o marca como usado recentemente"""
+        item_key = (tenant, namespace, key)
+        with self._lock:
+            item = self._items.get(item_key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._items.move_to_end(item_key)
+            self._hits += 1
+            return item[0]
+
+    def set(
+        self,
+        tenant: Any,
+        namespace: str,
+        key: Hashable,
+        value: Any,
+        size: Optional[int] = None
+    ) -> bool:
+        """
+        Armazena um valor, removendo os itens menos usados até caber no orçamento.
+        Retorna False se o valor sozinho for maior que o orçamento.
+        """
+        if size is None:
+            size = self.estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"Item de {size} bytes excede o orçamento do cache ({namespace})")
+            return False
+
+        item_key = (tenant, namespace, key)
+        with self._lock:
+            self._pop(item_key)
+            while self._items and self._size + size > self.max_bytes:
+                self._pop(next(iter(self._items)))
+
+            self._items[item_key] = (value, size)
+            self._tenant_keys.setdefault(tenant, set()).add(item_key)
+            self._size += size
+        return True
+
+    def invalidate_tenant(self, tenant: Any, namespace: Optional[str] = None) -> None:
+        """Remove os itens de um tenant, opcionalmente apenas de um namespace"""
+        with self._lock:
+            for item_key in list(self._tenant_keys.get(tenant, ())):
+                if namespace is None or item_key[1] == namespace:
+                    self._pop(item_key)
+
+    def stats(self) -> Dict[str, int]:
+        """Métricas básicas de uso do cache"""
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "tenants": len(self._tenant_keys),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def _pop(self, item_key: Tuple[Any, str, Hashable]) -> None:
+        """Remove um item mantendo o tamanho e o índice por tenant consistentes"""
+        item = self._items.pop(item_key, None)
+        if item is None:
+            return
+        self._size -= item[1]
+        keys = self._tenant_keys.get(item_key[0])
+        if keys is not None:
+            keys.discard(item_key)
+            if not keys:
+                del self._tenant_keys[item_key[0]]
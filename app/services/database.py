@@ -1,8 +1,16 @@
+from sqlalchemy import func, inspect, text
 from sqlalchemy.orm import Session
 from app.models.database import ResumeEntry
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
+from app.services.tracing import traced
 from loguru import logger
+import threading
+
+# Revisão em memória do currículo de cada portfólio, incrementada a cada escrita.
+# Vale para este processo, assim como os caches que a usam como chave
+_revisions: Dict[Optional[int], int] = {}
+_revisions_lock = threading.Lock()
 
 def create_resume_entry(
     db: Session,
@@ -10,11 +18,12 @@ def create_resume_entry(
     title: str,
     description: str,
     start_date: datetime = None,
-    end_date: datetime = None
+    end_date: datetime = None,
+    owner_id: Optional[int] = None
 ) -> ResumeEntry:
     """Cria uma nova entrada no currículo"""
     try:
-        logger.debug(f"Criando entrada: categoria={category}, título={title}")
+        logger.debug(f"Criando entrada: portfólio={owner_id}, categoria={category}, título={title}")
         
         # Converte a data se for string
         if isinstance(start_date, str):
@@ -31,6 +40,7 @@ def create_resume_entry(
             description=description,
             start_date=start_date,
             end_date=end_date,
+            owner_id=owner_id,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
@@ -39,6 +49,7 @@ def create_resume_entry(
         db.add(db_entry)
         db.commit()
         db.refresh(db_entry)
+        bump_resume_revision(owner_id)
         
         logger.debug(f"Entrada criada com sucesso: ID={db_entry.id}")
         return db_entry
@@ -48,13 +59,68 @@ def create_resume_entry(
         db.rollback()
         raise 
 
-def get_resume_entries(db: Session, category: Optional[str] = None) -> List[ResumeEntry]:
-    """Retorna todas as entradas do currículo, opcionalmente filtradas por categoria"""
+def migrate_resume_owner(db: Session) -> None:
+    """
+    Adiciona a coluna owner_id (e seu índice) a tabelas de currículo criadas
+    antes dos portfólios por usuário. create_all não altera tabelas existentes.
+    Pode ser chamado a cada inicialização.
+    """
+    table = ResumeEntry.__tablename__
     try:
-        query = db.query(ResumeEntry)
+        columns = {column["name"] for column in inspect(db.connection()).get_columns(table)}
+        if "owner_id" not in columns:
+            db.execute(text(f"ALTER TABLE {table} ADD COLUMN owner_id INTEGER REFERENCES users(id)"))
+            logger.info("Coluna owner_id adicionada às entradas do currículo")
+        db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_owner_id ON {table} (owner_id)"))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Erro ao migrar entradas do currículo: {str(e)}")
+        db.rollback()
+        raise
+
+def filter_by_owner(query, owner_id: Optional[int]):
+    """
+    Restringe a consulta ao portfólio de um usuário.
+    owner_id None corresponde ao portfólio padrão (entradas sem dono).
+    """
+    if owner_id is None:
+        return query.filter(ResumeEntry.owner_id.is_(None))
+    return query.filter(ResumeEntry.owner_id == owner_id)
+
+@traced("db.get_resume_entries")
+def get_resume_entries(
+    db: Session,
+    category: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[ResumeEntry]:
+    """
+    Retorna as entradas do currículo de um portfólio, opcionalmente filtradas por categoria.
+    Com limit, retorna apenas as limit entradas mais recentes.
+    """
+    try:
+        query = filter_by_owner(db.query(ResumeEntry), owner_id)
         if category:
             query = query.filter(ResumeEntry.category == category)
+        if limit is not None:
+            query = query.order_by(ResumeEntry.id.desc()).limit(limit)
         return query.all()
     except Exception as e:
         logger.error(f"Erro ao buscar entradas do currículo: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+def bump_resume_revision(owner_id: Optional[int] = None) -> None:
+    """Marca o currículo de um portfólio como alterado"""
+    with _revisions_lock:
+        _revisions[owner_id] = _revisions.get(owner_id, 0) + 1
+
+def get_resume_revision(owner_id: Optional[int] = None) -> int:
+    """
+    Revisão do currículo de um portfólio, usada como chave de cache. Muda a cada
+    escrita feita por create_resume_entry, sem consultar o banco.
+    """
+    return _revisions.get(owner_id, 0)
+
+def count_resume_entries(db: Session, owner_id: Optional[int] = None) -> int:
+    """Número de entradas do currículo de um portfólio"""
+    return filter_by_owner(db.query(func.count(ResumeEntry.id)), owner_id).scalar()
@@ -1,10 +1,14 @@
 from llama_cpp import Llama
 from pathlib import Path
 from loguru import logger
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from app.core.config import settings
 from app.models.database import ResumeEntry
-from functools import lru_cache
+from app.services.database import count_resume_entries, get_resume_entries
+from app.services.search import find_relevant_entries
+from app.services.cache import TenantCache
+from app.services.tracing import span, traced
+from sqlalchemy.orm import Session
 import threading
 
 class LLMService:
@@ -27,6 +31,10 @@ class LLMService:
             self.max_tokens = 512
             self.temperature = 0.7
             self.cache_size = 100
+            self.max_context_entries = 20
+            self.cache = TenantCache(settings.TENANT_CACHE_MAX_BYTES)
+            self.kv_state_cache_enabled = settings.KV_STATE_CACHE_ENABLED
+            self._model_lock = threading.Lock()
             self.initialized = True
             self.initialize_model()
 
@@ -49,10 +57,53 @@ class LLMService:
             logger.error(f"Erro ao inicializar o modelo: {str(e)}")
             raise
 
-    @lru_cache(maxsize=100)
-    def get_cached_response(self, question: str, context_hash: str) -> Optional[str]:
-        """Cache de respostas para perguntas similares"""
-        return None
+    def get_cached_response(self, tenant_id: Optional[int], question: str, context_hash: str) -> Optional[str]:
+        """Cache de respostas por portfólio para perguntas já respondidas com o mesmo contexto"""
+        return self.cache.get(tenant_id, "answer", (context_hash, question.strip().lower()))
+
+    def invalidate_tenant(self, tenant_id: Optional[int]) -> None:
+        """Descarta contexto, respostas e estado KV de um portfólio após alterações no currículo"""
+        self.cache.invalidate_tenant(tenant_id)
+
+    @traced("llm.select_entries")
+    def select_entries(
+        self,
+        db: Session,
+        question: str,
+        owner_id: Optional[int] = None
+    ) -> Tuple[List[ResumeEntry], bool]:
+        """
+        Seleciona as entradas que vão para o prompt e informa se são o portfólio inteiro.
+        Portfólios pequenos vão inteiros, o que mantém o contexto estável entre perguntas;
+        nos maiores, vão até max_context_entries entradas (as relacionadas à pergunta pelo
+        índice full-text, ou as mais recentes), e o resultado nunca conta como portfólio inteiro.
+        """
+        total_entries = count_resume_entries(db, owner_id)
+        if total_entries > self.max_context_entries:
+            try:
+                entries = find_relevant_entries(
+                    db, question, limit=self.max_context_entries, owner_id=owner_id
+                )
+                if entries:
+                    logger.info(f"Pré-filtro selecionou {len(entries)} de {total_entries} entradas")
+                    return entries, False
+            except Exception as e:
+                logger.warning(f"Pré-filtro por palavra-chave indisponível: {str(e)}")
+            # Sem termos relevantes na pergunta, vão as entradas mais recentes: o portfólio
+            # inteiro não caberia no contexto do modelo
+            logger.info(f"Pré-filtro sem resultados, usando as {self.max_context_entries} entradas mais recentes")
+            return get_resume_entries(db, owner_id=owner_id, limit=self.max_context_entries), False
+        return get_resume_entries(db, owner_id=owner_id), True
+
+    def get_context(self, tenant_id: Optional[int], resume_entries: List[ResumeEntry]) -> str:
+        """Retorna o contexto formatado do portfólio, reaproveitando o cache quando as entradas não mudaram"""
+        key = tuple((entry.id, entry.updated_at) for entry in resume_entries)
+        context = self.cache.get(tenant_id, "context", key)
+        if context is None:
+            with span("llm.prepare_context", entries=len(resume_entries)):
+                context = self.prepare_context(resume_entries)
+            self.cache.set(tenant_id, "context", key, context)
+        return context
 
     def prepare_context(self, resume_entries: List[ResumeEntry]) -> str:
         """Prepara o contexto do currículo com otimização de tokens"""
@@ -95,61 +146,153 @@ class LLMService:
             parts.append(date_str)
         return parts
 
-    def generate_response(self, question: str, context: str) -> str:
-        """Gera uma resposta com configurações mais básicas"""
-        try:
-            prompt = f"""Pergunta: {question}
+    def _state_size(self, state) -> int:
+        """Tamanho aproximado em bytes de um estado salvo do modelo"""
+        size = getattr(state, "llama_state_size", 0)
+        for attr in ("input_ids", "scores"):
+            size += getattr(getattr(state, attr, None), "nbytes", 0)
+        return size
+
+    def _model_starts_with(self, state) -> bool:
+        """Indica se os tokens já avaliados pelo modelo começam com os tokens do estado salvo"""
+        n_tokens = state.n_tokens
+        if n_tokens == 0 or self.model.n_tokens < n_tokens:
+            return False
+        return bool((self.model.input_ids[:n_tokens] == state.input_ids[:n_tokens]).all())
+
+    def _restore_prefix_state(self, tenant_id: Optional[int], context_hash: str, prefix: str) -> None:
+        """
+        Restaura o estado KV do prefixo (contexto) do portfólio. O estado só é
+        salvo quando o mesmo prefixo aparece pela segunda vez: salvar copia todo o
+        estado do llama, o que não compensa para um contexto visto uma única vez.
+        Sem estado salvo, o llama ainda reaproveita o prefixo do prompt anterior;
+        pelo mesmo motivo, o estado salvo não é carregado (outra cópia completa)
+        quando o modelo já começa com o prefixo.
+        """
+        state = self.cache.get(tenant_id, "kv_state", context_hash)
+        if state is not None:
+            if self._model_starts_with(state):
+                # Pergunta seguida no mesmo portfólio: o llama reaproveita o prefixo sozinho
+                logger.info("Prefixo do contexto já carregado no modelo")
+                return
+            logger.info("Estado KV do contexto encontrado no cache")
+            self.model.load_state(state)
+            return
+
+        if self.cache.get(tenant_id, "kv_seen", context_hash) is None:
+            self.cache.set(tenant_id, "kv_seen", context_hash, True)
+            return
 
-Contexto:
+        self.model.reset()
+        self.model.eval(self.model.tokenize(prefix.encode("utf-8")))
+        state = self.model.save_state()
+        self.cache.set(tenant_id, "kv_state", context_hash, state, size=self._state_size(state))
+
+    @traced("llm.generate_response")
+    def generate_response(
+        self,
+        question: str,
+        context: str,
+        tenant_id: Optional[int] = None,
+        context_hash: Optional[str] = None
+    ) -> str:
+        """
+        Gera uma resposta. Com context_hash, o estado KV do contexto do portfólio
+        é reaproveitado entre perguntas; deve ser passado apenas para contextos estáveis.
+        """
+        try:
+            # O contexto vem antes da pergunta para que o prefixo do prompt seja reaproveitável
+            prefix = f"""Contexto:
 {context}
 
+"""
+            prompt = f"""{prefix}Pergunta: {question}
+
 Resposta:"""
 
-            logger.info(f"Gerando resposta para prompt: {prompt}")
+            with span("llm.log_prompt"):
+                logger.info(f"Gerando resposta para prompt: {prompt}")
 
-            response = self.model(
-                prompt,
-                max_tokens=256,
-                temperature=0.5,
-                top_p=0.95,
-                top_k=40,
-                repeat_penalty=1.0,
-                echo=False
-            )
+            with span("llm.wait_model_lock"):
+                self._model_lock.acquire()
+            try:
+                if self.kv_state_cache_enabled and context_hash:
+                    with span("llm.prefix_state"):
+                        self._restore_prefix_state(tenant_id, context_hash, prefix)
 
-            logger.info(f"Resposta bruta do modelo: {response}")
+                stream = self.model(
+                    prompt,
+                    max_tokens=256,
+                    temperature=0.5,
+                    top_p=0.95,
+                    top_k=40,
+                    repeat_penalty=1.0,
+                    echo=False,
+                    stream=True
+                )
+                # Em streaming, o primeiro pedaço só sai depois da avaliação do prompt,
+                # o que separa o tempo de avaliação do tempo de amostragem
+                with span("llm.prompt_eval"):
+                    chunks = [next(stream, None)]
+                with span("llm.sampling") as attrs:
+                    chunks.extend(stream)
+                    # O último pedaço só traz o finish_reason, sem texto
+                    attrs["tokens"] = sum(
+                        1 for chunk in chunks if chunk and chunk['choices'][0]['text']
+                    )
+            finally:
+                self._model_lock.release()
 
-            if not response or 'choices' not in response:
-                logger.error("Formato de resposta inválido")
-                return "Erro ao gerar resposta."
+            if not chunks[0] or 'choices' not in chunks[0]:
+                raise ValueError("Formato de resposta inválido")
 
-            text = response['choices'][0]['text'].strip()
+            text = "".join(chunk['choices'][0]['text'] for chunk in chunks).strip()
             logger.info(f"Texto extraído: {text}")
 
-            return text if text else "Não foi possível gerar uma resposta."
+            return text
 
         except Exception as e:
             logger.error(f"Erro detalhado na geração: {str(e)}")
-            return f"Erro ao processar: {str(e)}"
+            raise
 
-    def answer_question(self, question: str, resume_entries: List[ResumeEntry]) -> str:
-        """Método principal otimizado para responder perguntas"""
+    @traced("llm.answer_question")
+    def answer_question(
+        self,
+        question: str,
+        resume_entries: List[ResumeEntry],
+        tenant_id: Optional[int] = None,
+        full_portfolio: bool = False
+    ) -> str:
+        """
+        Método principal otimizado para responder perguntas sobre o currículo de um portfólio.
+        full_portfolio indica que as entradas são o portfólio inteiro, cujo contexto
+        se repete entre perguntas e por isso tem o estado KV reaproveitado.
+        """
         try:
-            logger.info(f"Processando pergunta: {question}")
+            logger.info(f"Processando pergunta (portfólio={tenant_id}): {question}")
             
-            context = self.prepare_context(resume_entries)
+            context = self.get_context(tenant_id, resume_entries)
             context_hash = str(hash(context))
             
-            cached_response = self.get_cached_response(question, context_hash)
+            cached_response = self.get_cached_response(tenant_id, question, context_hash)
             if cached_response:
                 logger.info("Resposta encontrada no cache")
                 return cached_response
             
-            response = self.generate_response(question, context)
+            response = self.generate_response(
+                question,
+                context,
+                tenant_id,
+                context_hash if full_portfolio else None
+            )
+            if not response:
+                return "Não foi possível gerar uma resposta."
+
+            self.cache.set(tenant_id, "answer", (context_hash, question.strip().lower()), response)
             logger.info("Nova resposta gerada com sucesso")
             
             return response
             
         except Exception as e:
             logger.error(f"Erro em answer_question: {str(e)}")
-            return "Ocorreu um erro ao processar sua pergunta." 
\ No newline at end of file
+            return "Ocorreu um erro ao processar sua pergunta."
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator
+from app.core.config import settings
+from loguru import logger
+
+@contextmanager
+def profile_request(name: str, enabled: bool) -> Iterator[Dict[str, str]]:
+    """
+    Executa o trecho sob o profiler por amostragem (pyinstrument) quando enabled.
+    O flamegraph é salvo em PROFILE_DIR no formato do speedscope e o caminho
+    fica disponível em result["path"] ao final do bloco.
+    """
+    result: Dict[str, str] = {}
+    if not enabled:
+        yield result
+        return
+
+    # Importado só quando necessário: o profiler não faz parte do caminho normal
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    profiler = Profiler(interval=settings.PROFILE_INTERVAL)
+    profiler.start()
+    try:
+        yield result
+    finally:
+        profiler.stop()
+        try:
+            profile_dir = Path(settings.PROFILE_DIR)
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+            path = profile_dir / f"{name}-{timestamp}.speedscope.json"
+            path.write_text(profiler.output(renderer=SpeedscopeRenderer()), encoding="utf-8")
+            result["path"] = str(path)
+            logger.info(f"Perfil salvo em {path}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar perfil: {str(e)}")
@@ -0,0 +1,435 @@
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.database import ResumeEntry
+from app.services.cache import TenantCache
+from app.services.database import filter_by_owner
+from typing import Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+import math
+import re
+import unicodedata
+
+ENTRIES_TABLE = ResumeEntry.__tablename__
+FTS_TABLE = f"{ENTRIES_TABLE}_fts"
+# O índice lê o conteúdo desta view, que acrescenta o token do dono de cada entrada
+FTS_SOURCE = f"{FTS_TABLE}_source"
+
+TEXT_COLUMNS = ("title", "description", "category")
+# Pesos do bm25 na ordem das colunas de texto do índice: title, description, category
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Comprimentos com índice de prefixo: prefixos mais longos são truncados no MATCH
+# (para continuarem usando o índice) e conferidos por inteiro no ranking
+PREFIX_LENGTHS = (2, 3, 4, 5, 6)
+
+# Entradas ordenadas por vez: os resultados vêm em janelas das mais recentes às
+# mais antigas, e cada janela é ordenada pelo bm25. Limita o custo da busca mesmo
+# quando um termo aparece em milhares de entradas do portfólio
+RANK_WINDOW = 100
+
+# Total de entradas e entradas por termo de cada portfólio, usados no IDF do bm25;
+# descartados a cada escrita no portfólio
+search_cache = TenantCache(settings.SEARCH_CACHE_MAX_BYTES)
+
+SNIPPET_TOKENS = 16
+SNIPPET_ELLIPSIS = "…"
+
+# Palavras muito comuns em perguntas que só poluem o pré-filtro do LLM (já sem acentos)
+STOPWORDS = {
+    "que", "qual", "quais", "como", "onde", "quando", "sobre", "para", "com",
+    "sem", "uma", "umas", "uns", "dos", "das", "nos", "nas", "pelo", "pela",
+    "seu", "sua", "seus", "suas", "ele", "ela", "voce", "tem", "teve",
+    "foi", "sao", "esta", "isso", "mais", "muito",
+    "what", "which", "how", "where", "when", "about", "with", "the", "and",
+    "does", "did", "has", "have", "his", "her", "your", "you", "are", "was",
+}
+
+# Mesmo critério do tokenizer unicode61: letras e dígitos, "_" separa termos
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+FTS_DDL = f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    title, description, category, owner,
+    content='{FTS_SOURCE}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='{" ".join(str(length) for length in PREFIX_LENGTHS)}'
+)"""
+
+_OWNER_EXPR = "'owner' || coalesce({alias}.owner_id, 'none')"
+
+_COMBINING_RE = re.compile("[\u0300-\u036f]")
+
+def _normalize(value: str) -> str:
+    """Minúsculas e sem acentos, como o tokenizer do índice"""
+    value = value.lower()
+    if value.isascii():
+        return value
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", value))
+
+def _tokenize(value: str) -> List[str]:
+    """Quebra o texto em termos seguros para uma expressão MATCH do FTS5"""
+    return _TOKEN_RE.findall(_normalize(value or ""))
+
+def _owner_token(owner_id: Optional[int]) -> str:
+    return f"owner{owner_id if owner_id is not None else 'none'}"
+
+def _build_match_query(
+    terms: Sequence[Tuple[str, bool]],
+    owner_id: Optional[int],
+    operator: str = "AND",
+    truncate_prefix: bool = True
+) -> str:
+    """
+    Monta a expressão MATCH restrita ao portfólio: o token do dono é filtrado
+    dentro do índice e os termos do usuário só valem nas colunas de texto.
+    Cada termo vira uma string entre aspas, evitando erros de sintaxe do FTS5.
+    """
+    parts = []
+    for term, is_prefix in terms:
+        if is_prefix and truncate_prefix:
+            term = term[:max(length for length in PREFIX_LENGTHS if length <= len(term))]
+        parts.append(f'"{term}"*' if is_prefix else f'"{term}"')
+    return (
+        f'owner : "{_owner_token(owner_id)}" AND '
+        f'{{{" ".join(TEXT_COLUMNS)}}} : ({f" {operator} ".join(parts)})'
+    )
+
+def _query_terms(value: str) -> List[Tuple[str, bool]]:
+    """Termos da busca como (termo, é_prefixo); o último casa por prefixo, para buscas enquanto o usuário digita"""
+    tokens = list(dict.fromkeys(_tokenize(value)))
+    terms = [(token, False) for token in tokens]
+    if terms and len(terms[-1][0]) >= min(PREFIX_LENGTHS):
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+def _term_hits(value: str, term: str, is_prefix: bool) -> int:
+    """
+    Ocorrências do termo no texto já normalizado. Procura a substring (em C) e
+    confere as fronteiras do termo, sem tokenizar o texto inteiro.
+    """
+    hits = 0
+    start = value.find(term)
+    while start >= 0:
+        end = start + len(term)
+        if (start == 0 or not value[start - 1].isalnum()) and (
+            is_prefix or end == len(value) or not value[end].isalnum()
+        ):
+            hits += 1
+        start = value.find(term, end)
+    return hits
+
+def _column_sizes(blob: bytes) -> List[int]:
+    """Número de tokens de cada coluna, guardado pelo FTS5 em %_docsize como varints"""
+    if blob.isascii():
+        return list(blob)
+    sizes = []
+    value = 0
+    for byte in blob:
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            sizes.append(value)
+            value = 0
+    return sizes
+
+def init_search_index(db: Session) -> None:
+    """
+    Cria o índice FTS5 das entradas do currículo e os triggers que o mantêm
+    sincronizado com a tabela. Pode ser chamado a cada inicialização; se o
+    esquema do índice mudou, ele é recriado e reindexado.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        logger.warning("Busca full-text disponível apenas com SQLite, índice não criado")
+        return
+
+    try:
+        stored = db.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).scalar()
+        rebuild = stored != FTS_DDL
+
+        for suffix in ("ai", "ad", "au"):
+            db.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+        if rebuild and stored is not None:
+            db.execute(text(f"DROP TABLE {FTS_TABLE}"))
+            logger.info("Esquema do índice de busca mudou, recriando")
+
+        db.execute(text(f"DROP VIEW IF EXISTS {FTS_SOURCE}"))
+        db.execute(text(f"""
+            CREATE VIEW {FTS_SOURCE} AS
+            SELECT e.id, e.title, e.description, e.category, {_OWNER_EXPR.format(alias="e")} AS owner
+            FROM {ENTRIES_TABLE} AS e
+        """))
+        if rebuild:
+            db.execute(text(FTS_DDL))
+
+        new_owner = _OWNER_EXPR.format(alias="new")
+        old_owner = _OWNER_EXPR.format(alias="old")
+        db.execute(text(f"""
+            CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {ENTRIES_TABLE} BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, title, description, category, owner)
+                VALUES (new.id, new.title, new.description, new.category, {new_owner});
+            END
+        """))
+        db.execute(text(f"""
+            CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {ENTRIES_TABLE} BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category, owner)
+                VALUES ('delete', old.id, old.title, old.description, old.category, {old_owner});
+            END
+        """))
+        db.execute(text(f"""
+            CREATE TRIGGER {FTS_TABLE}_au
+            AFTER UPDATE OF title, description, category, owner_id ON {ENTRIES_TABLE} BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category, owner)
+                VALUES ('delete', old.id, old.title, old.description, old.category, {old_owner});
+                INSERT INTO {FTS_TABLE}(rowid, title, description, category, owner)
+                VALUES (new.id, new.title, new.description, new.category, {new_owner});
+            END
+        """))
+
+        if rebuild:
+            # Indexa as entradas que já existiam antes da criação do índice
+            db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            logger.info("Índice de busca do currículo criado")
+
+        db.commit()
+    except Exception as e:
+        logger.error(f"Erro ao criar índice de busca: {str(e)}")
+        db.rollback()
+        raise
+
+def _portfolio_stats(
+    db: Session,
+    terms: Sequence[Tuple[str, bool]],
+    owner_id: Optional[int]
+) -> Tuple[int, List[int]]:
+    """
+    Estatísticas do portfólio inteiro para o IDF do bm25: total de entradas e,
+    para cada termo, quantas entradas o contêm (contagem feita no índice, já
+    filtrada pelo dono). Prefixos longos são contados pelo prefixo truncado.
+    Ficam em cache até a próxima escrita no portfólio.
+    """
+    n_entries = search_cache.get(owner_id, "stats", "entries")
+    if n_entries is None:
+        n_entries = filter_by_owner(db.query(func.count(ResumeEntry.id)), owner_id).scalar()
+        search_cache.set(owner_id, "stats", "entries", n_entries)
+
+    term_hits = []
+    for term in terms:
+        n_hits = search_cache.get(owner_id, "stats", term)
+        if n_hits is None:
+            n_hits = db.execute(
+                text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"),
+                {"match": _build_match_query([term], owner_id)}
+            ).scalar()
+            search_cache.set(owner_id, "stats", term, n_hits)
+        term_hits.append(n_hits)
+    return n_entries, term_hits
+
+def _bm25(
+    candidates: Sequence[Tuple[int, Sequence[str], int]],
+    terms: Sequence[Tuple[str, bool]],
+    stats: Tuple[int, Sequence[int]],
+    require_all: bool
+) -> List[Tuple[int, float]]:
+    """
+    Mesma fórmula do bm25 do FTS5, com o IDF calculado a partir das estatísticas
+    do portfólio (ver _portfolio_stats) em vez do índice de todos os portfólios;
+    o tamanho médio das entradas vem dos candidatos. Cada candidato é
+    (rowid, colunas de texto normalizadas, tamanho em tokens). Retorna (rowid, rank),
+    do mais ao menos relevante; como no FTS5, menor rank é melhor.
+    """
+    rows = []
+    for rowid, columns, length in candidates:
+        freqs = [
+            sum(
+                weight * _term_hits(value, term, is_prefix)
+                for weight, value in zip(COLUMN_WEIGHTS, columns)
+            )
+            for term, is_prefix in terms
+        ]
+        if require_all and not all(freqs):
+            # Candidato trazido por um prefixo truncado que não casa por inteiro
+            continue
+        rows.append((rowid, freqs, length))
+
+    if not rows:
+        return []
+
+    n_entries, term_hits = stats
+    avg_length = sum(length for _, _, length in rows) / len(rows) or 1.0
+    idfs = []
+    for n_hits in term_hits:
+        idf = math.log((max(n_entries - n_hits, 0) + 0.5) / (n_hits + 0.5))
+        idfs.append(idf if idf > 0 else 1e-6)
+
+    ranked = []
+    for rowid, freqs, length in rows:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+        score = sum(
+            idf * (freq * (BM25_K1 + 1)) / (freq + norm)
+            for idf, freq in zip(idfs, freqs)
+        )
+        ranked.append((rowid, -score))
+    ranked.sort(key=lambda row: (row[1], row[0]))
+    return ranked
+
+def _rank_entries(
+    db: Session,
+    terms: Sequence[Tuple[str, bool]],
+    owner_id: Optional[int],
+    operator: str,
+    limit: int,
+    offset: int = 0
+) -> List[Tuple[int, float]]:
+    """
+    Retorna (rowid, rank) das entradas do portfólio que casam com os termos.
+    Os candidatos vêm do índice já filtrados pelo dono, em janelas de RANK_WINDOW
+    entradas das mais recentes às mais antigas; cada janela é ordenada pelo bm25.
+    Com até RANK_WINDOW resultados, a ordem é a do bm25 no portfólio inteiro.
+    """
+    match = _build_match_query(terms, owner_id, operator)
+    stats = _portfolio_stats(db, terms, owner_id)
+    ranked: List[Tuple[int, float]] = []
+    start = 0
+    while len(ranked) < offset + limit:
+        rows = db.execute(
+            text(f"""
+                WITH candidates AS (
+                    SELECT rowid FROM {FTS_TABLE}
+                    WHERE {FTS_TABLE} MATCH :match
+                    ORDER BY rowid DESC
+                    LIMIT :size OFFSET :start
+                )
+                SELECT e.id, e.title, e.description, e.category, d.sz
+                FROM candidates
+                JOIN {ENTRIES_TABLE} AS e ON e.id = candidates.rowid
+                JOIN {FTS_TABLE}_docsize AS d ON d.id = candidates.rowid
+            """),
+            {"match": match, "size": RANK_WINDOW, "start": start}
+        ).all()
+
+        candidates = [
+            (
+                row.id,
+                [_normalize(value or "") for value in row[1:4]],
+                sum(_column_sizes(row.sz)[:len(TEXT_COLUMNS)])
+            )
+            for row in rows
+        ]
+        ranked.extend(_bm25(candidates, terms, stats, require_all=operator == "AND"))
+        if len(rows) < RANK_WINDOW:
+            break
+        start += RANK_WINDOW
+    return ranked[offset:offset + limit]
+
+def _snippet(entry: ResumeEntry, terms: Sequence[Tuple[str, bool]]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Trecho em texto puro da coluna com mais termos encontrados, com as posições
+    (início, fim) de cada ocorrência dentro do trecho. Nada é interpretado como HTML.
+    """
+    values = [getattr(entry, column) or "" for column in TEXT_COLUMNS]
+    normalized = [_normalize(value) for value in values]
+    column_hits = [
+        sum(_term_hits(value, term, is_prefix) for term, is_prefix in terms)
+        for value in normalized
+    ]
+    # Em caso de empate vale a primeira coluna (title, description, category)
+    best = column_hits.index(max(column_hits))
+    value = values[best]
+
+    tokens = [match.span() for match in _TOKEN_RE.finditer(value)]
+    words = _TOKEN_RE.findall(normalized[best])
+    if len(words) != len(tokens):
+        # A normalização mudou a divisão em termos (ex.: acentos decompostos)
+        words = [_normalize(value[start:end]) for start, end in tokens]
+    exact = {term for term, is_prefix in terms if not is_prefix}
+    prefixes = tuple(term for term, is_prefix in terms if is_prefix)
+    hits = [
+        i for i, word in enumerate(words)
+        if word in exact or (prefixes and word.startswith(prefixes))
+    ]
+    if not tokens:
+        return value, []
+
+    # Janela de SNIPPET_TOKENS termos começando um pouco antes da primeira ocorrência
+    first = max(0, hits[0] - 2) if hits else 0
+    start_token = min(first, max(0, len(tokens) - SNIPPET_TOKENS))
+    end_token = min(len(tokens), start_token + SNIPPET_TOKENS)
+
+    start = tokens[start_token][0] if start_token > 0 else 0
+    end = tokens[end_token - 1][1] if end_token < len(tokens) else len(value)
+    prefix = SNIPPET_ELLIPSIS if start > 0 else ""
+    suffix = SNIPPET_ELLIPSIS if end < len(value) else ""
+
+    shift = len(prefix) - start
+    highlights = [
+        (tokens[i][0] + shift, tokens[i][1] + shift)
+        for i in hits
+        if start_token <= i < end_token
+    ]
+    return f"{prefix}{value[start:end]}{suffix}", highlights
+
+def _fetch_entries(db: Session, ids: List[int]) -> Dict[int, ResumeEntry]:
+    """Carrega as entradas pelo id, preservando o acesso por id"""
+    if not ids:
+        return {}
+    entries = db.query(ResumeEntry).filter(ResumeEntry.id.in_(ids)).all()
+    return {entry.id: entry for entry in entries}
+
+def search_resume_entries(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    owner_id: Optional[int] = None
+) -> Tuple[bool, List[Tuple[ResumeEntry, str, List[Tuple[int, int]], float]]]:
+    """
+    Busca entradas do currículo de um portfólio por palavra-chave.
+    Retorna se há mais resultados após a página e a página pedida como
+    (entrada, trecho, destaques, rank), ordenada por relevância (menor rank é melhor).
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return False, []
+
+    try:
+        # Um resultado a mais indica se existe próxima página, sem contar todos
+        ranked = _rank_entries(db, terms, owner_id, "AND", limit + 1, offset)
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+
+        entries = _fetch_entries(db, [rowid for rowid, _ in ranked])
+        results = []
+        for rowid, rank in ranked:
+            entry = entries.get(rowid)
+            if entry is not None:
+                snippet, highlights = _snippet(entry, terms)
+                results.append((entry, snippet, highlights, rank))
+        return has_more, results
+    except Exception as e:
+        logger.error(f"Erro ao buscar no índice do currículo: {str(e)}")
+        raise
+
+def find_relevant_entries(
+    db: Session,
+    question: str,
+    limit: int = 20,
+    owner_id: Optional[int] = None
+) -> List[ResumeEntry]:
+    """
+    Pré-filtro barato por palavra-chave para o LLM: retorna as entradas do
+    portfólio que contêm algum termo relevante da pergunta, das mais às menos relevantes.
+    """
+    terms = [
+        (token, False) for token in dict.fromkeys(_tokenize(question))
+        if len(token) > 2 and token not in STOPWORDS
+    ]
+    if not terms:
+        return []
+
+    ids = [rowid for rowid, _ in _rank_entries(db, terms, owner_id, "OR", limit)]
+    entries = _fetch_entries(db, ids)
+    return [entries[entry_id] for entry_id in ids if entry_id in entries]
@@ -0,0 +1,83 @@
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.models.database import ResumeEntry
+from app.schemas.resume import ResumeEntry as ResumeEntrySchema
+from app.services.cache import TenantCache
+import brotli
+import gzip
+import orjson
+
+ENTRY_FIELDS = tuple(ResumeEntrySchema.model_fields)
+
+# Desempate entre codificações com o mesmo q no Accept-Encoding
+ENCODINGS = ("br", "gzip")
+
+listing_cache = TenantCache(settings.LISTING_CACHE_MAX_BYTES)
+
+def serialize_entries(entries: Iterable[ResumeEntry]) -> bytes:
+    """
+    Serializa as entradas direto das linhas do ORM com orjson, sem passar pela
+    validação do Pydantic. Os campos seguem o schema público de ResumeEntry.
+    """
+    return orjson.dumps([
+        {field: getattr(entry, field) for field in ENTRY_FIELDS}
+        for entry in entries
+    ])
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe a codificação suportada com maior q no Accept-Encoding. A ordem de
+    ENCODINGS só desempata; "*" vale para as codificações não listadas.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        q = 1.0
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Comprime o corpo da resposta na codificação escolhida"""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"Codificação não suportada: {encoding}")
+
+def get_listing_payload(
+    owner_id: Optional[int],
+    key: Hashable,
+    accept_encoding: str,
+    build: Callable[[], bytes]
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Retorna o corpo da listagem já serializado e, acima do limite de tamanho,
+    já comprimido para o cliente. Cada variante é gerada uma única vez por chave
+    e guardada no cache do portfólio.
+    """
+    body = listing_cache.get(owner_id, "listing", (key, None))
+    if body is None:
+        body = build()
+        listing_cache.set(owner_id, "listing", (key, None), body, size=len(body))
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or len(body) < settings.COMPRESSION_MIN_SIZE:
+        return body, None
+
+    compressed = listing_cache.get(owner_id, "listing", (key, encoding))
+    if compressed is None:
+        compressed = compress(body, encoding)
+        listing_cache.set(owner_id, "listing", (key, encoding), compressed, size=len(compressed))
+    return compressed, encoding
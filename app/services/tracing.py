@@ -0,0 +1,115 @@
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from app.core.config import settings
+from loguru import logger
+import functools
+import inspect
+import orjson
+import os
+import threading
+import time
+
+# Converte perf_counter (monotônico, preciso) para tempo de parede em microssegundos
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+_FLUSH_EVERY = 100
+
+_events: deque = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+_pending: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+# Serializa as escritas em TRACE_FILE sem bloquear quem registra spans
+_write_lock = threading.Lock()
+
+def _record(name: str, start_ns: int, end_ns: int, attrs: Dict[str, Any]) -> None:
+    """Guarda o span como evento completo ("X") do Trace Event Format"""
+    event = {
+        "name": name,
+        "cat": name.split(".", 1)[0],
+        "ph": "X",
+        "ts": (start_ns + _EPOCH_OFFSET_NS) / 1000,
+        "dur": (end_ns - start_ns) / 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": attrs,
+    }
+    batch = None
+    with _lock:
+        _events.append(event)
+        if settings.TRACE_FILE:
+            _pending.append(event)
+            if len(_pending) >= _FLUSH_EVERY:
+                batch = _take_pending()
+    if batch:
+        _write(batch)
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Mede o tempo de um trecho de código. O dicionário retornado pode receber
+    atributos extras durante o trecho (ex.: número de tokens).
+    """
+    start_ns = time.perf_counter_ns()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _record(name, start_ns, time.perf_counter_ns(), attrs)
+
+def traced(name: Optional[str] = None):
+    """Decorator que registra um span a cada chamada da função (síncrona ou async)"""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_trace() -> Dict[str, Any]:
+    """Spans recentes no Trace Event Format (abre no Perfetto ou chrome://tracing)"""
+    with _lock:
+        events = list(_events)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def _take_pending() -> List[Dict[str, Any]]:
+    """Retira os spans pendentes; deve ser chamada com _lock adquirido"""
+    batch = _pending[:]
+    _pending.clear()
+    return batch
+
+def _write(batch: List[Dict[str, Any]]) -> None:
+    """
+    Acrescenta os spans em TRACE_FILE. O arquivo usa o formato de array JSON
+    do Trace Event Format, em que o "]" final é opcional, então pode crescer
+    só com appends. Roda fora de _lock para não travar as requisições no I/O.
+    """
+    data = b"".join(orjson.dumps(event) + b",\n" for event in batch)
+    with _write_lock:
+        try:
+            path = Path(settings.TRACE_FILE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as file:
+                if file.tell() == 0:
+                    file.write(b"[\n")
+                file.write(data)
+        except Exception as e:
+            logger.error(f"Erro ao exportar spans: {str(e)}")
+
+def flush_traces() -> None:
+    """Grava em TRACE_FILE os spans ainda não exportados"""
+    with _lock:
+        batch = _take_pending()
+    if batch:
+        _write(batch)
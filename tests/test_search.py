@@ -0,0 +1,91 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models.database import Base, ResumeEntry
+from app.services.search import (
+    find_relevant_entries,
+    init_search_index,
+    search_cache,
+    search_resume_entries,
+)
+import pytest
+
+OWNER = 1
+OTHER_OWNER = 2
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    init_search_index(session)
+    for owner_id in (None, OWNER, OTHER_OWNER):
+        search_cache.invalidate_tenant(owner_id)
+    yield session
+    session.close()
+
+def add_entries(db, owner_id, *entries):
+    rows = [
+        ResumeEntry(owner_id=owner_id, category="experience", title=title, description=description)
+        for title, description in entries
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+def search_titles(db, query, owner_id=OWNER):
+    _, results = search_resume_entries(db, query, owner_id=owner_id)
+    return [entry.title for entry, _, _, _ in results]
+
+def test_rare_term_outweighs_common_term(db):
+    # Todas as entradas do portfólio citam python; docker só aparece em duas
+    add_entries(
+        db, OWNER,
+        ("Mais python", "python python docker"),
+        ("Mais docker", "docker docker python"),
+        *[(f"Outra {i}", "python") for i in range(4)],
+    )
+    # Em outro portfólio docker é comum, o que não pode afetar o ranking acima
+    add_entries(db, OTHER_OWNER, *[(f"Docker {i}", "docker") for i in range(10)])
+
+    assert search_titles(db, "python docker") == ["Mais docker", "Mais python"]
+
+def test_title_matches_rank_above_description_matches(db):
+    add_entries(
+        db, OWNER,
+        ("Backend", "apis com fastapi e docker"),
+        ("Fastapi e docker", "backend"),
+        ("Frontend", "react"),
+    )
+
+    assert search_titles(db, "fastapi docker") == ["Fastapi e docker", "Backend"]
+
+def test_prefilter_ranks_entries_with_more_terms_first(db):
+    add_entries(
+        db, OWNER,
+        ("Infra", "kubernetes"),
+        ("Backend", "python e kubernetes"),
+        ("Dados", "python"),
+        ("Frontend", "react"),
+    )
+
+    entries = find_relevant_entries(db, "Quais projetos com Python e Kubernetes?", owner_id=OWNER)
+
+    assert [entry.title for entry in entries][0] == "Backend"
+    assert {entry.title for entry in entries} == {"Infra", "Backend", "Dados"}
+
+def test_pages_cover_every_match_once_across_windows(db, monkeypatch):
+    monkeypatch.setattr("app.services.search.RANK_WINDOW", 3)
+    add_entries(db, OWNER, *[(f"Python {i}", "python " * (i % 4 + 1)) for i in range(10)])
+
+    titles = []
+    offset = 0
+    has_more = True
+    while has_more:
+        has_more, results = search_resume_entries(db, "python", limit=4, offset=offset, owner_id=OWNER)
+        titles += [entry.title for entry, _, _, _ in results]
+        offset += 4
+
+    assert sorted(titles) == sorted(f"Python {i}" for i in range(10))